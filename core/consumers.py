@@ -2,8 +2,10 @@ import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from django.contrib.auth.models import User
 from core.models import Order, Message
-from asgiref.sync import database_sync_to_async
+from channels.db import database_sync_to_async
 from channels.layers import get_channel_layer
+from core.sqlite import db_writer
+from core.ratelimit import get_limiter
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
@@ -37,11 +39,17 @@ class ChatConsumer(AsyncWebsocketConsumer):
         )
 
     async def receive(self, text_data):
+        limiter = get_limiter()
+        if await limiter.ahit(limiter.websocket_scopes(self.scope)) is not None:
+            await self.send(text_data=json.dumps({'error': 'Rate limit exceeded.'}))
+            return
+
         text_data_json = json.loads(text_data)
         content = text_data_json['content']
 
-        # Save message to the database
-        message = await database_sync_to_async(Message.objects.create)(
+        # Save message to the database (serialized with other writes in tuned SQLite mode)
+        message = await db_writer.run_async(
+            Message.objects.create,
             order=self.order,
             sender=self.user,
             content=content
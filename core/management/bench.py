@@ -0,0 +1,24 @@
+"""
+Helpers shared by the bench_* management commands.
+"""
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def temporary_database(name=None):
+    """
+    Point the default connection at a fresh, migrated throwaway database so
+    benchmarks never write to the real one. `name` is a file path for
+    SQLite; None uses the backend's default test database.
+    """
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    test_settings['NAME'] = name
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
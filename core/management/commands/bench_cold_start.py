@@ -0,0 +1,107 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+STAGES = ('ready', 'first_request', 'first_websocket')
+
+# Runs in a fresh interpreter inside a checkout, the way an ASGI server
+# starts a worker: import fiverrclone.asgi, then serve an HTTP request and a
+# WebSocket handshake. Times are seconds since the interpreter began the
+# import, and each includes the stages before it.
+WORKER = """
+import asyncio, json, time
+start = time.perf_counter()
+from fiverrclone.asgi import application
+ready = time.perf_counter()
+from channels.testing import HttpCommunicator, WebsocketCommunicator
+
+async def first_requests():
+    http = HttpCommunicator(
+        application, 'POST', '/graphql/', body=b'{"query": "{ __typename }"}',
+        headers=[(b'host', b'localhost'), (b'content-type', b'application/json')],
+    )
+    response = await http.get_response(timeout=60)
+    served = time.perf_counter()
+    # The consumer looks the order up and rejects the socket; the handshake
+    # still goes through routing, auth and the consumer
+    ws = WebsocketCommunicator(application, '/ws/orders/0/', headers=[(b'host', b'localhost')])
+    connected, _ = await ws.connect(timeout=60)
+    if connected:
+        await ws.disconnect()
+    return response['status'], served, time.perf_counter()
+
+status, served, handshake = asyncio.run(first_requests())
+print(json.dumps({
+    'ready': ready - start, 'first_request': served - start, 'first_websocket': handshake - start,
+    'status': status,
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Time how long a fresh ASGI worker takes to import its application, serve "
+        "its first GraphQL request and complete its first WebSocket handshake, "
+        "optionally against a baseline git revision. Run against a migrated database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--baseline', metavar='REV', help="Git revision to compare against, e.g. the commit before the startup changes")
+
+    def handle(self, *args, **options):
+        base_dir = str(settings.BASE_DIR)
+        results = {}
+        if options['baseline']:
+            with tempfile.TemporaryDirectory() as tmp:
+                checkout = os.path.join(tmp, 'baseline')
+                subprocess.run(
+                    ['git', '-C', base_dir, 'worktree', 'add', '--detach', checkout, options['baseline']],
+                    check=True, capture_output=True,
+                )
+                try:
+                    results['baseline'] = self.measure(checkout, options['runs'])
+                finally:
+                    subprocess.run(['git', '-C', base_dir, 'worktree', 'remove', '--force', checkout], capture_output=True)
+        results['current'] = self.measure(base_dir, options['runs'])
+
+        for label, result in results.items():
+            self.report(label, result)
+        baseline, current = results.get('baseline'), results['current']
+        if baseline and current:
+            for stage in STAGES:
+                saved = baseline[stage] - current[stage]
+                self.stdout.write(f"{stage}: {saved * 1000:+.0f}ms saved ({saved / baseline[stage]:+.0%})")
+
+    def measure(self, checkout, runs):
+        # Deployments set the settings module in the environment
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'fiverrclone.settings'}
+        samples = []
+        for _ in range(runs):
+            proc = subprocess.run([sys.executable, '-c', WORKER], cwd=checkout, env=env, capture_output=True, text=True)
+            if proc.returncode:
+                lines = proc.stderr.strip().splitlines() or ['no output']
+                self.stderr.write(f"{checkout}: {lines[-1]}")
+                return None
+            samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        statuses = {sample['status'] for sample in samples}
+        if statuses != {200}:
+            self.stderr.write(f"{checkout}: first request returned {', '.join(map(str, sorted(statuses)))}")
+            return None
+        return {stage: statistics.median(sample[stage] for sample in samples) for stage in STAGES}
+
+    def report(self, label, result):
+        if result is None:
+            self.stdout.write(f"{label:>8}: could not start")
+            return
+        self.stdout.write(
+            f"{label:>8}: ready {result['ready'] * 1000:.0f}ms, "
+            f"first request {result['first_request'] * 1000:.0f}ms, "
+            f"first websocket {result['first_websocket'] * 1000:.0f}ms (median)"
+        )
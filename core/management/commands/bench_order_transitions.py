@@ -0,0 +1,70 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.management.bench import temporary_database
+from core.models import CustomUser, Gig, Order
+from core.transitions import InvalidTransition, StaleOrder, transition_order
+
+
+class Command(BaseCommand):
+    help = "Measure order status transitions per second when many requests race for the same orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=16, help="Concurrent attempts per order")
+
+    def handle(self, *args, **options):
+        # A file rather than shared-cache memory, so threads contend on real locks
+        with tempfile.TemporaryDirectory() as tmp, temporary_database(os.path.join(tmp, 'bench.sqlite3')):
+            seller = CustomUser.objects.create_user(username='bench-seller', password='pass')
+            buyer = CustomUser.objects.create_user(username='bench-buyer', password='pass')
+            gig = Gig.objects.create(title='Bench', description='Bench', price='10.00', seller=seller)
+            Order.objects.bulk_create(Order(buyer=buyer, gig=gig) for _ in range(options['orders']))
+            orders = list(Order.objects.all())
+            attempts, wins, elapsed = self.race(orders, options['workers'])
+            stored = Order.objects.exclude(version=1).count()
+
+        if wins != len(orders) or stored:
+            raise CommandError(f"Expected exactly one winning transition per order, got {wins} for {len(orders)}.")
+        self.stdout.write(
+            f"{attempts} attempts on {len(orders)} orders in {elapsed:.2f}s: "
+            f"{attempts / elapsed:.0f} attempts/s, {wins / elapsed:.0f} transitions/s"
+        )
+
+    def race(self, orders, workers):
+        lock = threading.Lock()
+        counts = {'attempts': 0, 'wins': 0}
+
+        def attempt(order_id, target, barrier):
+            try:
+                order = Order.objects.get(pk=order_id)
+                # Everyone reads the same version, then all write at once
+                barrier.wait()
+                try:
+                    transition_order(order, target)
+                    won = 1
+                except (StaleOrder, InvalidTransition):
+                    won = 0
+                with lock:
+                    counts['attempts'] += 1
+                    counts['wins'] += won
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        for order in orders:
+            barrier = threading.Barrier(workers)
+            threads = [
+                threading.Thread(target=attempt, args=(order.pk, 'active' if i % 2 else 'cancelled', barrier))
+                for i in range(workers)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        return counts['attempts'], counts['wins'], time.perf_counter() - start
@@ -0,0 +1,82 @@
+import time
+from types import SimpleNamespace
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+
+from core.ratelimit import LocalBackend, RateLimiter
+from core.views import top_level_fields
+
+# The kind of documents the frontend sends, with operation names
+DOCUMENTS = (
+    ("""
+    query SearchGigs($search: String, $minPrice: Float, $maxPrice: Float) {
+      gigs(search: $search, minPrice: $minPrice, maxPrice: $maxPrice) {
+        id title price createdAt seller { id username }
+      }
+    }""", 'SearchGigs'),
+    ("""
+    query GigDetail($id: Int!) {
+      gig(id: $id) { id title description price seller { id username isSeller } }
+    }""", 'GigDetail'),
+    ("""
+    mutation PlaceOrder($gigId: ID!, $description: String) {
+      createOrder(gigId: $gigId, description: $description) {
+        success errors order { id status }
+      }
+    }""", 'PlaceOrder'),
+    ("""
+    mutation Login($username: String!, $password: String!) {
+      tokenAuth(username: $username, password: $password) { token }
+    }""", 'Login'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the per-request overhead of GraphQL rate limiting: finding the "
+        "root fields of the document plus the token-bucket checks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200_000)
+        parser.add_argument('--clients', type=int, default=1000, help="Distinct client IPs")
+        parser.add_argument('--budget-us', type=float, default=50.0)
+
+    def handle(self, *args, **options):
+        # Limits high enough that every request is allowed and does full work
+        limiter = RateLimiter(LocalBackend(), {
+            'user': (1e9, 1e9),
+            'ip': (1e9, 1e9),
+            'operation': (1e9, 1e9),
+            'operation:tokenAuth': (1e9, 1e9),
+        })
+        user = AnonymousUser()
+        requests = [
+            SimpleNamespace(META={'REMOTE_ADDR': f'10.0.{i // 256}.{i % 256}'}, user=user)
+            for i in range(options['clients'])
+        ]
+
+        def check(i, query, operation_name):
+            request = requests[i % len(requests)]
+            limiter.hit(limiter.graphql_scopes(request, top_level_fields(query, operation_name)))
+
+        # Steady state: the same documents again and again, as from real clients
+        n = options['iterations']
+        start = time.perf_counter()
+        for i in range(n):
+            check(i, *DOCUMENTS[i % len(DOCUMENTS)])
+        per_call = (time.perf_counter() - start) / n * 1e6
+
+        # First sight of a document: a unique comment defeats the parse cache
+        cold_n = max(1, n // 20)
+        start = time.perf_counter()
+        for i in range(cold_n):
+            query, operation_name = DOCUMENTS[i % len(DOCUMENTS)]
+            check(i, f'# {i}\n{query}', operation_name)
+        cold_per_call = (time.perf_counter() - start) / cold_n * 1e6
+
+        self.stdout.write(f"{n} requests, {per_call:.2f}us per request (budget {options['budget_us']}us)")
+        self.stdout.write(f"{cold_n} never-seen documents, {cold_per_call:.2f}us per request (includes a full parse)")
+        if per_call > options['budget_us']:
+            raise CommandError("Rate limiter is over its latency budget.")
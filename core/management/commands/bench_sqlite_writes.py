@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.test.utils import override_settings
+
+from core.management.bench import temporary_database
+from core.models import CustomUser, Gig, Message, Order
+from core.sqlite import PRAGMAS, SerialWriter, db_writer
+
+# (label, apply pragmas, route writes through one writer thread)
+RAW_VARIANTS = (
+    ('default', False, False),
+    ('pragmas only', True, False),
+    ('writer only', False, True),
+    ('pragmas + writer', True, True),
+)
+
+
+class Command(BaseCommand):
+    help = "Benchmark concurrent SQLite write throughput with and without the tuned mode."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--writes', type=int, default=200, help="Writes per thread")
+        parser.add_argument('--timeout', type=float, default=5.0, help="Busy timeout in seconds (Django's default is 5)")
+
+    def handle(self, *args, **options):
+        self.stdout.write("sqlite3 module, one INSERT per write:")
+        for label, pragmas, serial in RAW_VARIANTS:
+            with tempfile.TemporaryDirectory() as tmp:
+                result = self.run_raw(os.path.join(tmp, 'bench.sqlite3'), pragmas, serial, options)
+            self.report(label, *result)
+
+        self.stdout.write("ORM, Message.objects.create through db_writer:")
+        for label, tuned in (('SQLITE_TUNED off', False), ('SQLITE_TUNED on', True)):
+            with tempfile.TemporaryDirectory() as tmp, override_settings(SQLITE_TUNED=tuned):
+                with temporary_database(os.path.join(tmp, 'bench.sqlite3')):
+                    result = self.run_orm(options)
+            self.report(label, *result)
+
+    def report(self, label, ok, locked, elapsed):
+        self.stdout.write(
+            f"{label:>18}: {ok} writes in {elapsed:.2f}s "
+            f"({ok / elapsed:.0f} writes/s), {locked} 'database is locked' errors"
+        )
+
+    def hammer(self, write, options, on_exit=None):
+        """Run `write(i)` from --threads threads; returns (ok, locked, elapsed)."""
+        counts = {'ok': 0, 'locked': 0}
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                for i in range(options['writes']):
+                    try:
+                        write(i)
+                        key = 'ok'
+                    except (sqlite3.OperationalError, OperationalError):
+                        key = 'locked'
+                    with lock:
+                        counts[key] += 1
+            finally:
+                if on_exit:
+                    on_exit()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return counts['ok'], counts['locked'], time.perf_counter() - start
+
+    def connect(self, path, pragmas, timeout):
+        conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        if pragmas:
+            for name, value in PRAGMAS:
+                conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def run_raw(self, path, pragmas, serial, options):
+        setup = self.connect(path, pragmas, options['timeout'])
+        setup.execute('CREATE TABLE message (id INTEGER PRIMARY KEY, content TEXT, timestamp REAL)')
+        setup.commit()
+
+        def insert(db, i):
+            db.execute('INSERT INTO message (content, timestamp) VALUES (?, ?)', (f'msg {i}', time.time()))
+            db.commit()
+
+        if serial:
+            # One connection, used only by the writer thread
+            writer = SerialWriter()
+            result = self.hammer(lambda i: writer.submit(insert, setup, i).result(), options)
+        else:
+            # One connection per thread, like one per consumer or request
+            local = threading.local()
+
+            def write(i):
+                if not hasattr(local, 'db'):
+                    local.db = self.connect(path, pragmas, options['timeout'])
+                insert(local.db, i)
+
+            def close():
+                if hasattr(local, 'db'):
+                    local.db.close()
+
+            result = self.hammer(write, options, on_exit=close)
+        setup.close()
+        return result
+
+    def run_orm(self, options):
+        seller = CustomUser.objects.create_user(username='bench-seller', password='pass')
+        buyer = CustomUser.objects.create_user(username='bench-buyer', password='pass')
+        gig = Gig.objects.create(title='Bench', description='Bench', price='10.00', seller=seller)
+        order = Order.objects.create(buyer=buyer, gig=gig)
+
+        def write(i):
+            db_writer.run(Message.objects.create, order=order, sender=buyer, content=f'msg {i}')
+
+        try:
+            return self.hammer(write, options, on_exit=connection.close)
+        finally:
+            # The writer thread keeps its connection; drop it before the
+            # temporary database is destroyed
+            db_writer.run(connection.close)
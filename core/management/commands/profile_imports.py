@@ -0,0 +1,50 @@
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+
+class Command(BaseCommand):
+    help = "Show the cumulative import cost of each module loaded when a worker starts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('modules', nargs='*', default=['fiverrclone.asgi'],
+                            help="Modules a worker imports after django.setup()")
+        parser.add_argument('--limit', type=int, default=30)
+        parser.add_argument('--by-package', action='store_true',
+                            help="Sum self time per top-level package instead")
+
+    def handle(self, *args, **options):
+        code = "import django; django.setup()\n" + "".join(f"import {m}\n" for m in options['modules'])
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'fiverrclone.settings')}
+        # A fresh interpreter, so nothing is already in sys.modules
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            capture_output=True, text=True, env=env,
+        )
+        if proc.returncode:
+            raise CommandError(proc.stderr.strip().splitlines()[-1])
+
+        rows = []
+        for line in proc.stderr.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if match:
+                self_us, cumulative_us, _, module = match.groups()
+                rows.append((module, int(self_us), int(cumulative_us)))
+
+        if options['by_package']:
+            totals = defaultdict(int)
+            for module, self_us, _ in rows:
+                totals[module.split('.')[0]] += self_us
+            rows = [(package, total, total) for package, total in totals.items()]
+
+        total_us = sum(self_us for _, self_us, _ in rows)
+        self.stdout.write(f"{'cumulative ms':>14} {'self ms':>9}  module")
+        for module, self_us, cumulative_us in sorted(rows, key=lambda r: r[2], reverse=True)[:options['limit']]:
+            self.stdout.write(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {module}")
+        self.stdout.write(f"\n{len(rows)} entries, {total_us / 1000:.1f}ms total import time")
@@ -35,6 +35,7 @@ class Order(models.Model):
     gig = models.ForeignKey('core.Gig', on_delete=models.CASCADE, related_name='orders')
     description = models.TextField(blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    version = models.PositiveIntegerField(default=0)  # Bumped on every status transition
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
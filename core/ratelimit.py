@@ -0,0 +1,182 @@
+"""
+Token-bucket rate limiting for GraphQL operations and WebSocket frames.
+
+Limits are configured in settings.RATE_LIMITS as {name: (rate_per_second,
+burst)}. Names are "user", "ip", "operation", "websocket", and optionally
+"operation:<rootField>" (e.g. "operation:tokenAuth") to override the default
+for one root query or mutation field.
+Bucket state lives in a pluggable backend (settings.RATE_LIMIT_BACKEND).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class LocalBackend:
+    """
+    In-process buckets, sharded so concurrent threads rarely share a lock.
+    Only limits a single process; use RedisBackend across workers.
+
+    Each shard is kept in least-recently-used order and holds at most
+    max_keys / shards buckets. When a new key is added, the oldest few
+    buckets are dropped if they have fully refilled (a full bucket is the
+    same as a missing one), then the oldest is evicted if the shard is
+    still over its cap. Eviction work per call is constant.
+    """
+
+    sweep = 2
+    blocking = False
+
+    def __init__(self, shards=64, max_keys=100_000, clock=time.monotonic):
+        self.shards = [(OrderedDict(), threading.Lock()) for _ in range(shards)]
+        self.max_keys = max(1, max_keys // shards)
+        self.clock = clock
+
+    def take(self, key, rate, burst):
+        """Take one token. Returns (allowed, seconds until a token is available)."""
+        now = self.clock()
+        buckets, lock = self.shards[hash(key) % len(self.shards)]
+        with lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                tokens = burst
+            else:
+                tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                buckets.move_to_end(key)
+            if tokens >= 1:
+                tokens -= 1
+                allowed, retry_after = True, 0.0
+            else:
+                allowed, retry_after = False, (1 - tokens) / rate
+            buckets[key] = (tokens, now, rate, burst)
+            if bucket is None:
+                self._evict(buckets, now)
+        return allowed, retry_after
+
+    def _evict(self, buckets, now):
+        for _ in range(self.sweep):
+            key, (tokens, updated, rate, burst) = next(iter(buckets.items()))
+            # Judged by the bucket's own limit, so a drained slow bucket stays
+            if len(buckets) == 1 or tokens + (now - updated) * rate < burst:
+                break
+            del buckets[key]
+        while len(buckets) > self.max_keys:
+            buckets.popitem(last=False)
+
+
+TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBackend:
+    """
+    Buckets shared by all workers, updated atomically by a Lua script.
+    `client` is anything with redis-py's register_script().
+    """
+
+    blocking = True  # A network round-trip; keep it off the event loop
+
+    def __init__(self, client=None, prefix='ratelimit:', clock=time.time):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(settings.RATE_LIMIT_REDIS_URL)
+        self.script = client.register_script(TAKE_SCRIPT)
+        self.prefix = prefix
+        self.clock = clock
+
+    def take(self, key, rate, burst):
+        allowed, tokens = self.script(keys=[self.prefix + key], args=[rate, burst, self.clock()])
+        if int(allowed):
+            return True, 0.0
+        return False, (1 - float(tokens)) / rate
+
+
+class RateLimiter:
+    def __init__(self, backend, limits):
+        self.backend = backend
+        self.limits = limits
+
+    def hit(self, scopes):
+        """
+        Consume a token from each (limit name, key) pair in `scopes`.
+        Returns None if allowed, otherwise seconds to wait before retrying.
+        """
+        for name, key in scopes:
+            limit = self.limits.get(name)
+            if limit is None:
+                continue
+            allowed, retry_after = self.backend.take(f'{name}:{key}', *limit)
+            if not allowed:
+                return retry_after
+        return None
+
+    async def ahit(self, scopes):
+        """hit() for async callers; blocking backends run in a worker thread."""
+        if self.backend.blocking:
+            return await sync_to_async(self.hit, thread_sensitive=False)(scopes)
+        return self.hit(scopes)
+
+    def graphql_scopes(self, request, fields):
+        """
+        `fields` are the root field names the operation selects (tokenAuth,
+        gigs, ...), taken from the parsed document rather than the
+        client-chosen operationName.
+        """
+        ip = request.META.get('REMOTE_ADDR', '')
+        user = getattr(request, 'user', None)
+        ident = f'u{user.pk}' if user is not None and user.is_authenticated else ip
+        scopes = [('ip', ip)]
+        if ident != ip:
+            scopes.insert(0, ('user', ident))
+        seen = set()
+        for field in fields:
+            name = f'operation:{field}'
+            if name in self.limits:
+                # Fields with their own limit pay per selection, so aliasing
+                # tokenAuth several times in one request doesn't batch attempts
+                scopes.append((name, f'{ident}:{field}'))
+            elif field not in seen:
+                scopes.append(('operation', f'{ident}:{field}'))
+            seen.add(field)
+        return scopes
+
+    def websocket_scopes(self, scope):
+        client = scope.get('client') or ('', 0)
+        user = scope.get('user')
+        scopes = [('ip', client[0])]
+        if user is not None and user.is_authenticated:
+            scopes.append(('websocket', f'u{user.pk}'))
+        else:
+            scopes.append(('websocket', client[0]))
+        return scopes
+
+
+_limiter = None
+
+
+def get_limiter():
+    global _limiter
+    if _limiter is None:
+        backend = import_string(getattr(settings, 'RATE_LIMIT_BACKEND', 'core.ratelimit.LocalBackend'))()
+        _limiter = RateLimiter(backend, getattr(settings, 'RATE_LIMITS', {}))
+    return _limiter
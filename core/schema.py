@@ -2,14 +2,11 @@ import graphene
 from graphene_django.types import DjangoObjectType
 from .models import CustomUser, Gig, Order, Message, Review
 from graphql_jwt.decorators import login_required
-from django.contrib.auth import get_user_model
-from django.utils.translation import gettext_lazy as _
-from django.core.exceptions import ValidationError      
-from .forms import GigForm, UserProfileForm  
+from .sqlite import db_writer
+from .transitions import transition_order, TransitionError
 import graphql_jwt
 from graphene_file_upload.scalars import Upload
 from django.db.models import Q
-from django.contrib.auth import get_user_model  
 
 
 # GraphQL Types
@@ -82,7 +79,7 @@ class RegisterUser(graphene.Mutation):
         user = CustomUser(username=username, email=email)
         user.set_password(password)
         try:
-            user.save()
+            db_writer.run(user.save)
             return RegisterUser(user=user, success=True, errors=[])
         except Exception as e:
             return RegisterUser(user=None, success=False, errors=[str(e)])
@@ -104,6 +101,9 @@ class UpdateUserProfile(graphene.Mutation):
         if not user.is_authenticated:
             return UpdateUserProfile(success=False, errors=["Authentication required."])
 
+        # Forms are only needed by a couple of mutations, so load them on first use
+        from .forms import UserProfileForm
+
         form = UserProfileForm(
             data={'bio': bio, 'location': location, 'skills': skills},
             files={'profile_image': profile_image} if profile_image else None,
@@ -111,7 +111,11 @@ class UpdateUserProfile(graphene.Mutation):
         )
 
         if form.is_valid():
-            form.save()
+            user = form.save(commit=False)
+            # Store the upload here so only the row update runs on the writer thread
+            if profile_image:
+                user.profile_image.save(profile_image.name, profile_image, save=False)
+            db_writer.run(user.save)
             return UpdateUserProfile(user=user, success=True, errors=[])
         return UpdateUserProfile(success=False, errors=form.errors.get_json_data())
 
@@ -131,6 +135,8 @@ class CreateGig(graphene.Mutation):
         if not user.is_authenticated:
             return CreateGig(success=False, gig=None, errors=["Authentication required."])
 
+        from .forms import GigForm
+
         form = GigForm(data={
             "title": title,
             "description": description,
@@ -140,7 +146,7 @@ class CreateGig(graphene.Mutation):
         if form.is_valid():
             gig = form.save(commit=False)
             gig.seller = user
-            gig.save()
+            db_writer.run(gig.save)
             return CreateGig(success=True, gig=gig, errors=[])
         else:
             error_list = [f"{field}: {error[0]['message']}" for field, error in form.errors.get_json_data().items()]
@@ -170,7 +176,7 @@ class UpdateGig(graphene.Mutation):
             if description: gig.description = description
             if price: gig.price = price
 
-            gig.save()
+            db_writer.run(gig.save)
             return UpdateGig(success=True, gig=gig, errors=[])
 
         except Gig.DoesNotExist:
@@ -191,7 +197,7 @@ class DeleteGig(graphene.Mutation):
             if gig.seller != user:
                 return DeleteGig(success=False, errors=["You are not authorized to delete this gig."])
 
-            gig.delete()
+            db_writer.run(gig.delete)
             return DeleteGig(success=True, errors=[])
 
         except Gig.DoesNotExist:
@@ -221,7 +227,8 @@ class CreateOrder(graphene.Mutation):
         if gig.seller == user:
             return CreateOrder(success=False, errors=["You cannot order your own gig."])
 
-        order = Order.objects.create(
+        order = db_writer.run(
+            Order.objects.create,
             buyer=user,
             gig=gig,
             description=description
@@ -262,8 +269,11 @@ class UpdateOrderStatus(graphene.Mutation):
         else:
             return UpdateOrderStatus(success=False, errors=["Invalid or restricted status update."])
 
-        order.status = status
-        order.save()
+        # Conditional UPDATE on (status, version) so concurrent clicks can't both win
+        try:
+            db_writer.run(transition_order, order, status)
+        except TransitionError as e:
+            return UpdateOrderStatus(success=False, errors=[str(e)])
 
         return UpdateOrderStatus(order=order, success=True, errors=[])
 
@@ -289,7 +299,7 @@ class DeleteOrder(graphene.Mutation):
             return DeleteOrder(success=False, errors=["You are not authorized to delete this order"])
 
         # Delete the order
-        order.delete()
+        db_writer.run(order.delete)
         return DeleteOrder(success=True, errors=[])
 
 
@@ -322,7 +332,8 @@ class SendMessage(graphene.Mutation):
             raise Exception("You are not authorized to send messages for this order.")
         
         # Create the message
-        message = Message.objects.create(
+        message = db_writer.run(
+            Message.objects.create,
             order=order,
             sender=user,
             content=content
@@ -357,7 +368,8 @@ class CreateReview(graphene.Mutation):
         if Review.objects.filter(gig=gig, reviewer=user).exists():
             return CreateReview(success=False, errors=["You already reviewed this gig"])
 
-        review = Review.objects.create(
+        review = db_writer.run(
+            Review.objects.create,
             gig=gig,
             reviewer=user,
             rating=rating,
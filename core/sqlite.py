@@ -0,0 +1,104 @@
+"""
+Tuned SQLite mode (settings.SQLITE_TUNED).
+
+Applies WAL and friends to every new SQLite connection. Mutations and chat
+messages hand their ORM writes to db_writer, which runs them one at a time
+on a single thread, so they queue up instead of failing with "database is
+locked". Everything else (hashing, file storage, reads) stays on the caller.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from fiverrclone.db_router import pin_to_primary, record_write, reset_routing
+
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('mmap_size', 256 * 1024 * 1024),
+    ('cache_size', -64000),  # Negative means KiB, so ~64MB
+)
+
+
+def is_enabled():
+    return getattr(settings, 'SQLITE_TUNED', False)
+
+
+def apply_pragmas(cursor, read_only=False):
+    for name, value in PRAGMAS:
+        # Switching to WAL writes the file header, which fails on a read-only
+        # connection; replicas keep whatever mode the primary's copy has
+        if read_only and name == 'journal_mode':
+            continue
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_read_only(connection):
+    return (
+        connection.alias in getattr(settings, 'DATABASE_REPLICAS', [])
+        or 'mode=ro' in str(connection.settings_dict['NAME'])
+    )
+
+
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """connection_created receiver."""
+    if connection.vendor != 'sqlite' or not is_enabled():
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, read_only=is_read_only(connection))
+
+
+class SerialWriter:
+    """
+    Runs write callables one at a time on a dedicated thread.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite-writer')
+        return self._executor
+
+    def _call(self, fn, args, kwargs):
+        # Routing state is per thread, so pin the writer thread for this job
+        # only; reads inside a write job must see the primary.
+        self._local.in_writer = True
+        pin_to_primary()
+        close_old_connections()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            close_old_connections()
+            reset_routing()
+            self._local.in_writer = False
+
+    def submit(self, fn, *args, **kwargs):
+        # The caller wrote, so its later reads must see that write
+        record_write()
+        return self._get_executor().submit(self._call, fn, args, kwargs)
+
+    def run(self, fn, *args, **kwargs):
+        if not is_enabled() or getattr(self._local, 'in_writer', False):
+            return fn(*args, **kwargs)
+        return self.submit(fn, *args, **kwargs).result()
+
+    async def run_async(self, fn, *args, **kwargs):
+        if not is_enabled():
+            # Imported here so WSGI workers, which never call this, skip channels
+            from channels.db import database_sync_to_async
+
+            return await database_sync_to_async(fn)(*args, **kwargs)
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+
+db_writer = SerialWriter()
+
@@ -1,3 +1,469 @@
-from django.test import TestCase
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+
+from fiverrclone.db_router import (
+    PrimaryReplicaRouter, ReplicaSelector, ReplicaStickinessMiddleware, allow_replica_reads, check_connection,
+    is_pinned, reset_routing,
+)
+from .consumers import ChatConsumer
+from .models import CustomUser, Gig, Order
+from .sqlite import SerialWriter, apply_pragmas
+from .ratelimit import LocalBackend, RateLimiter, RedisBackend
+from .transitions import transition_order, InvalidTransition, StaleOrder
+from .views import top_level_fields
+
+try:
+    import fakeredis
+    import lupa  # noqa: F401  Needed by fakeredis to run Lua scripts
+except ImportError:
+    fakeredis = None
+
+
+def make_order(suffix=""):
+    seller = CustomUser.objects.create_user(username=f"seller{suffix}", password="pass")
+    buyer = CustomUser.objects.create_user(username=f"buyer{suffix}", password="pass")
+    gig = Gig.objects.create(title="Logo", description="A logo", price="10.00", seller=seller)
+    return Order.objects.create(buyer=buyer, gig=gig)
+
+
+def add_sqlite_alias(alias, name):
+    configured = connections.configure_settings({
+        "default": connections.settings["default"],
+        alias: {"ENGINE": "django.db.backends.sqlite3", "NAME": name},
+    })
+    connections.settings[alias] = configured[alias]
+
+
+def remove_alias(alias):
+    connections[alias].close()
+    del connections[alias]
+    del connections.settings[alias]
+
+
+class OrderTransitionTests(TestCase):
+    def setUp(self):
+        self.order = make_order()
+
+    def test_allowed_transition_bumps_version(self):
+        transition_order(self.order, "active")
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "active")
+        self.assertEqual(self.order.version, 1)
+
+    def test_disallowed_transition(self):
+        with self.assertRaises(InvalidTransition):
+            transition_order(self.order, "completed")
+
+    def test_stale_instance_is_rejected(self):
+        stale = Order.objects.get(pk=self.order.pk)
+        transition_order(self.order, "active")
+        with self.assertRaises(StaleOrder):
+            transition_order(stale, "cancelled")
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "active")
+
+
+class OrderTransitionStressTests(TransactionTestCase):
+    workers = 20
+    rounds = 10
+
+    def test_concurrent_transitions(self):
+        orders = [make_order(i) for i in range(self.rounds)]
+        results = []
+        lock = threading.Lock()
+
+        def attempt(order_id, target, barrier):
+            try:
+                order = Order.objects.get(pk=order_id)
+                # Every worker reads the same version before anyone writes
+                barrier.wait()
+                try:
+                    transition_order(order, target)
+                    outcome = target
+                except (StaleOrder, InvalidTransition):
+                    outcome = None
+                with lock:
+                    results.append((order_id, outcome))
+            finally:
+                connection.close()
+
+        for order in orders:
+            barrier = threading.Barrier(self.workers)
+            threads = [
+                threading.Thread(target=attempt, args=(order.pk, "active" if i % 2 else "cancelled", barrier))
+                for i in range(self.workers)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        attempts = self.workers * self.rounds
+        self.assertEqual(len(results), attempts)
+        for order in orders:
+            order.refresh_from_db()
+            winners = [r for oid, r in results if oid == order.pk and r is not None]
+            # Exactly one attempt per order wins, and it matches the stored state
+            self.assertEqual(len(winners), 1)
+            self.assertEqual(order.status, winners[0])
+            self.assertEqual(order.version, 1)
+
+
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        # Local SQLite files stand in for the replicas
+        self.tmp = tempfile.TemporaryDirectory()
+        self.files = {}
+        for alias in ("replica1", "replica2"):
+            path = os.path.join(self.tmp.name, f"{alias}.sqlite3")
+            sqlite3.connect(path).close()
+            self.files[alias] = path
+        self.clock = [0.0]
+        self.selector = ReplicaSelector(
+            self.files, check=self.check, cooldown=30, clock=lambda: self.clock[0],
+        )
+        self.router = PrimaryReplicaRouter(replicas=self.files, selector=self.selector)
+        reset_routing()
+        allow_replica_reads()
+
+    def tearDown(self):
+        reset_routing()
+        self.tmp.cleanup()
+
+    def check(self, alias):
+        try:
+            sqlite3.connect(f"file:{self.files[alias]}?mode=rw", uri=True).close()
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def test_reads_round_robin_over_replicas(self):
+        reads = {self.router.db_for_read(Order) for _ in range(4)}
+        self.assertEqual(reads, {"replica1", "replica2"})
+
+    def test_writes_go_to_primary_and_pin_reads(self):
+        self.assertEqual(self.router.db_for_write(Order), "default")
+        self.assertEqual(self.router.db_for_read(Order), "default")
+        reset_routing()
+        allow_replica_reads()
+        self.assertIn(self.router.db_for_read(Order), self.files)
+
+    def test_reads_outside_graphql_queries_use_primary(self):
+        reset_routing()
+        self.assertEqual(self.router.db_for_read(Order), "default")
+
+    def test_unhealthy_replica_is_skipped_until_cooldown(self):
+        os.remove(self.files["replica1"])
+        reads = {self.router.db_for_read(Order) for _ in range(4)}
+        self.assertEqual(reads, {"replica2"})
+        self.assertTrue(self.selector.is_down("replica1"))
+
+        sqlite3.connect(self.files["replica1"]).close()
+        self.clock[0] += 31
+        reads = {self.router.db_for_read(Order) for _ in range(4)}
+        self.assertEqual(reads, {"replica1", "replica2"})
+
+    def test_falls_back_to_primary_when_no_replica_is_healthy(self):
+        for path in self.files.values():
+            os.remove(path)
+        self.assertEqual(self.router.db_for_read(Order), "default")
+
+
+class ReplicaStickinessTests(TestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter(
+            replicas=["replica1"], selector=ReplicaSelector(["replica1"], check=lambda alias: True),
+        )
+        self.read_from = None
+
+    def serve(self, view, cookies=None):
+        request = RequestFactory().post("/graphql/")
+        request.COOKIES.update(cookies or {})
+        return ReplicaStickinessMiddleware(view)(request)
+
+    def write_view(self, request):
+        self.router.db_for_write(Order)
+        return HttpResponse()
+
+    def read_view(self, request):
+        allow_replica_reads()  # As OperationRoutingMiddleware does for a query
+        self.read_from = self.router.db_for_read(Order)
+        return HttpResponse()
+
+    def test_query_after_mutation_in_next_request_reads_primary(self):
+        response = self.serve(self.write_view)
+        marker = response.cookies[ReplicaStickinessMiddleware.cookie_name].value
+
+        self.serve(self.read_view, {ReplicaStickinessMiddleware.cookie_name: marker})
+        self.assertEqual(self.read_from, "default")
+
+        # Another client, with no recent write, reads the replica
+        self.serve(self.read_view)
+        self.assertEqual(self.read_from, "replica1")
+
+    def test_expired_marker_reads_replica(self):
+        self.serve(self.read_view, {ReplicaStickinessMiddleware.cookie_name: str(time.time() - 1)})
+        self.assertEqual(self.read_from, "replica1")
+
+    def test_reads_only_do_not_set_marker(self):
+        response = self.serve(self.read_view)
+        self.assertNotIn(ReplicaStickinessMiddleware.cookie_name, response.cookies)
+
+
+class ReplicaHealthCheckTests(TestCase):
+    alias = "health_replica"
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "replica.sqlite3")
+        # Configured the same way settings.py configures DB_REPLICAS
+        add_sqlite_alias(self.alias, f"file:{self.path}?mode=ro")
+
+    def tearDown(self):
+        remove_alias(self.alias)
+        self.tmp.cleanup()
+
+    def test_missing_replica_fails_and_is_not_created(self):
+        self.assertFalse(check_connection(self.alias))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_existing_replica_passes(self):
+        sqlite3.connect(self.path).close()
+        self.assertTrue(check_connection(self.alias))
+        # Probing again on the open connection still runs a query
+        self.assertTrue(check_connection(self.alias))
+
+    def test_passing_check_is_cached_until_recheck(self):
+        calls = []
+        clock = [0.0]
+        selector = ReplicaSelector(["r"], check=lambda alias: calls.append(alias) or True, recheck=5, clock=lambda: clock[0])
+        selector.select()
+        selector.select()
+        self.assertEqual(len(calls), 1)
+        clock[0] += 6
+        selector.select()
+        self.assertEqual(len(calls), 2)
+
+
+class TunedSQLiteTests(TestCase):
+    def test_pragmas(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = sqlite3.connect(os.path.join(tmp, "tuned.sqlite3"))
+            apply_pragmas(conn.cursor())
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+            conn.close()
+
+    @override_settings(SQLITE_TUNED=True)
+    def test_read_only_replica_still_passes_health_check(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "replica.sqlite3")
+            conn = sqlite3.connect(path)  # Default rollback journal, not WAL
+            conn.execute("CREATE TABLE t (id INTEGER)")
+            conn.close()
+            add_sqlite_alias("tuned_replica", f"file:{path}?mode=ro")
+            try:
+                self.assertTrue(check_connection("tuned_replica"))
+                with connections["tuned_replica"].cursor() as cursor:
+                    cursor.execute("PRAGMA cache_size")
+                    self.assertEqual(cursor.fetchone()[0], -64000)
+            finally:
+                remove_alias("tuned_replica")
+
+    @override_settings(SQLITE_TUNED=True)
+    def test_receiver_tunes_django_connections(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            add_sqlite_alias("tuned_primary", os.path.join(tmp, "primary.sqlite3"))
+            try:
+                with connections["tuned_primary"].cursor() as cursor:
+                    cursor.execute("PRAGMA journal_mode")
+                    self.assertEqual(cursor.fetchone()[0], "wal")
+                    cursor.execute("PRAGMA cache_size")
+                    self.assertEqual(cursor.fetchone()[0], -64000)
+            finally:
+                remove_alias("tuned_primary")
+
+    @override_settings(SQLITE_TUNED=True)
+    def test_writes_run_on_single_writer_thread(self):
+        writer = SerialWriter()
+        names = {writer.run(lambda: threading.current_thread().name) for _ in range(3)}
+        self.assertEqual(len(names), 1)
+        self.assertTrue(names.pop().startswith("sqlite-writer"))
+
+    @override_settings(SQLITE_TUNED=True)
+    def test_writer_thread_is_pinned_only_during_a_job(self):
+        writer = SerialWriter()
+        self.assertTrue(writer.run(is_pinned))
+        # Submitted straight to the executor, bypassing the job wrapper
+        self.assertFalse(writer._get_executor().submit(is_pinned).result())
+
+    @override_settings(SQLITE_TUNED=False)
+    def test_writes_run_inline_when_disabled(self):
+        writer = SerialWriter()
+        self.assertEqual(writer.run(threading.current_thread), threading.current_thread())
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        self.now = [0.0]
+
+    def make_limiter(self, backend):
+        return RateLimiter(backend, {"ip": (1, 3), "operation": (100, 100), "operation:tokenAuth": (1, 1)})
+
+    def request(self, ip="1.2.3.4"):
+        return SimpleNamespace(META={"REMOTE_ADDR": ip}, user=AnonymousUser())
+
+    def test_burst_then_refill(self):
+        self.check_burst_then_refill(LocalBackend(clock=lambda: self.now[0]))
+
+    @skipUnless(fakeredis, "fakeredis[lua] is not installed")
+    def test_redis_script_burst_then_refill(self):
+        # fakeredis runs TAKE_SCRIPT itself through its Lua interpreter
+        self.check_burst_then_refill(RedisBackend(fakeredis.FakeRedis(), clock=lambda: self.now[0]))
+
+    def check_burst_then_refill(self, backend):
+        limiter = self.make_limiter(backend)
+        scopes = limiter.graphql_scopes(self.request(), ["gigs"])
+        results = [limiter.hit(scopes) for _ in range(4)]
+        self.assertEqual(results[:3], [None, None, None])
+        self.assertAlmostEqual(results[3], 1.0)
+        self.now[0] += 1
+        self.assertIsNone(limiter.hit(scopes))
+
+    def test_blocking_backend_runs_off_the_event_loop(self):
+        backend = LocalBackend()
+        backend.blocking = True
+        threads = []
+        take = backend.take
+        backend.take = lambda *args: threads.append(threading.current_thread()) or take(*args)
+        limiter = self.make_limiter(backend)
+
+        async def run():
+            await limiter.ahit(limiter.graphql_scopes(self.request(), ["gigs"]))
+            return threading.current_thread()
+
+        loop_thread = async_to_sync(run)()
+        self.assertTrue(threads)
+        self.assertNotIn(loop_thread, threads)
+
+    def test_local_backend_caps_keys_per_shard(self):
+        backend = LocalBackend(shards=1, max_keys=10, clock=lambda: self.now[0])
+        for i in range(100):
+            backend.take(f"ip:{i}", 1, 3)
+        self.assertEqual(len(backend.shards[0][0]), 10)
+
+    def test_local_backend_keeps_drained_slow_bucket(self):
+        backend = LocalBackend(shards=1, max_keys=10, clock=lambda: self.now[0])
+        backend.take("operation:tokenAuth:1.2.3.4", 0.001, 1)
+        self.now[0] += 5
+        # Fast buckets that would count as refilled under their own limit
+        for i in range(5):
+            backend.take(f"ip:{i}", 100, 1)
+        allowed, _ = backend.take("operation:tokenAuth:1.2.3.4", 0.001, 1)
+        self.assertFalse(allowed)
+
+    def test_ips_have_separate_buckets(self):
+        limiter = self.make_limiter(LocalBackend(clock=lambda: self.now[0]))
+        for _ in range(3):
+            limiter.hit(limiter.graphql_scopes(self.request("1.1.1.1"), ["gigs"]))
+        self.assertIsNotNone(limiter.hit(limiter.graphql_scopes(self.request("1.1.1.1"), ["gigs"])))
+        self.assertIsNone(limiter.hit(limiter.graphql_scopes(self.request("2.2.2.2"), ["gigs"])))
+
+    def test_per_operation_override(self):
+        limiter = self.make_limiter(LocalBackend(clock=lambda: self.now[0]))
+        self.assertIsNone(limiter.hit(limiter.graphql_scopes(self.request(), ["tokenAuth"])))
+        self.assertIsNotNone(limiter.hit(limiter.graphql_scopes(self.request(), ["tokenAuth"])))
+
+
+class StartupTests(TestCase):
+    def imported_modules(self, code):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "fiverrclone.settings"}
+        code += "\nimport sys; print(' '.join(sys.modules))"
+        proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+        return set(proc.stdout.split())
+
+    def test_worker_startup_does_not_build_schema(self):
+        modules = self.imported_modules("import fiverrclone.asgi")
+        self.assertNotIn("core.schema", modules)
+        self.assertNotIn("core.forms", modules)
+
+    def test_warm_up_builds_schema(self):
+        modules = self.imported_modules(
+            "import fiverrclone.asgi\nfrom fiverrclone.startup import warm_up\nwarm_up()"
+        )
+        self.assertIn("fiverrclone.schema", modules)
+
+    def test_schema_defers_forms(self):
+        modules = self.imported_modules("import django; django.setup(); import fiverrclone.schema")
+        self.assertNotIn("core.forms", modules)
+
+
+TOKEN_AUTH = 'tokenAuth(username: "a", password: "b") { token }'
+
+
+class GraphQLRateLimitTests(TestCase):
+    def setUp(self):
+        self.limiter = RateLimiter(LocalBackend(), {"operation": (100, 100), "operation:tokenAuth": (0.001, 1)})
+        patcher = mock.patch("core.views.get_limiter", return_value=self.limiter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, query, operation_name=None):
+        body = {"query": query}
+        if operation_name:
+            body["operationName"] = operation_name
+        return self.client.post("/graphql/", json.dumps(body), content_type="application/json")
+
+    def test_top_level_fields_ignore_operation_name_and_aliases(self):
+        self.assertEqual(top_level_fields(f"mutation {{ {TOKEN_AUTH} }}"), ("tokenAuth",))
+        self.assertEqual(top_level_fields(f"mutation x {{ a: {TOKEN_AUTH} }}", "x"), ("tokenAuth",))
+        self.assertEqual(
+            top_level_fields(f"mutation {{ ...F }} fragment F on Mutation {{ {TOKEN_AUTH} }}"), ("tokenAuth",),
+        )
+
+    def test_rate_limited_response(self):
+        self.assertNotEqual(self.post(f"mutation {{ {TOKEN_AUTH} }}").status_code, 429)
+        response = self.post(f"mutation {{ {TOKEN_AUTH} }}")
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+        self.assertIn("errors", response.json())
+
+    def test_renamed_token_auth_shares_the_limit(self):
+        self.post(f"mutation {{ {TOKEN_AUTH} }}")
+        self.assertEqual(self.post(f"mutation x {{ {TOKEN_AUTH} }}", "x").status_code, 429)
+        self.assertEqual(self.post(f"mutation y {{ {TOKEN_AUTH} }}", "y").status_code, 429)
+
+    def test_aliased_token_auth_pays_per_selection(self):
+        response = self.post(f"mutation {{ a: {TOKEN_AUTH} b: {TOKEN_AUTH} }}")
+        self.assertEqual(response.status_code, 429)
+
+
+class ChatRateLimitTests(TestCase):
+    def test_rate_limited_frame_is_dropped(self):
+        consumer = ChatConsumer()
+        consumer.scope = {"client": ("1.2.3.4", 1234), "user": AnonymousUser()}
+        consumer.send = mock.AsyncMock()
+        limiter = RateLimiter(LocalBackend(), {"websocket": (0.001, 1)})
+        limiter.hit(limiter.websocket_scopes(consumer.scope))  # Drain the bucket
+
+        with mock.patch("core.consumers.get_limiter", return_value=limiter), \
+                mock.patch("core.consumers.db_writer") as writer:
+            writer.run_async = mock.AsyncMock()
+            async_to_sync(consumer.receive)(text_data=json.dumps({"content": "hi"}))
+
+        writer.run_async.assert_not_awaited()
+        consumer.send.assert_awaited_once_with(text_data=json.dumps({"error": "Rate limit exceeded."}))
@@ -0,0 +1,52 @@
+from django.db.models import F
+from .models import Order
+
+
+# Allowed order state graph: current status -> statuses it may move to
+ALLOWED_TRANSITIONS = {
+    'pending': {'active', 'cancelled'},
+    'active': {'completed', 'cancelled'},
+    'completed': set(),
+    'cancelled': set(),
+}
+
+
+class TransitionError(Exception):
+    pass
+
+
+class InvalidTransition(TransitionError):
+    pass
+
+
+class StaleOrder(TransitionError):
+    pass
+
+
+def can_transition(current, target):
+    return target in ALLOWED_TRANSITIONS.get(current, set())
+
+
+def transition_order(order, target):
+    """
+    Move `order` to `target` with a single conditional UPDATE.
+
+    The row is only written if it still has the status and version we read,
+    so two concurrent transitions can never both succeed. On success the
+    in-memory instance is updated to match the database.
+    """
+    if not can_transition(order.status, target):
+        raise InvalidTransition(f"Cannot change order from {order.status} to {target}.")
+
+    updated = Order.objects.filter(
+        pk=order.pk,
+        status=order.status,
+        version=order.version,
+    ).update(status=target, version=F('version') + 1)
+
+    if not updated:
+        raise StaleOrder("Order was modified by another request. Please reload and try again.")
+
+    order.status = target
+    order.version += 1
+    return order
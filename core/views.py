@@ -1,3 +1,89 @@
-from django.shortcuts import render
+import json
+import math
+from functools import lru_cache
 
-# Create your views here.
+from django.http import HttpResponse
+from graphene_django.views import GraphQLView, HttpError
+from graphql import (
+    FieldNode, FragmentDefinitionNode, FragmentSpreadNode, GraphQLError, InlineFragmentNode,
+    OperationDefinitionNode, parse,
+)
+
+from .ratelimit import get_limiter
+
+
+# Documents longer than this are parsed every time rather than cached
+MAX_CACHED_QUERY_LENGTH = 10_000
+
+
+def top_level_fields(query, operation_name=None):
+    """
+    Root field names selected by the operation that will run, following
+    inline fragments and fragment spreads. Aliases are ignored, so
+    `mutation x { a: tokenAuth(...) }` yields ("tokenAuth",).
+
+    Clients send the same few documents over and over, so results are
+    cached by query string; only the first request for a document pays for
+    the extra parse on top of graphene's own.
+    """
+    if not query:
+        return ()
+    if len(query) > MAX_CACHED_QUERY_LENGTH:
+        return _top_level_fields(query, operation_name)
+    return _cached_top_level_fields(query, operation_name)
+
+
+def _top_level_fields(query, operation_name):
+    try:
+        document = parse(query)
+    except GraphQLError:
+        return ()  # Rejected by graphene before anything executes
+
+    fragments = {d.name.value: d for d in document.definitions if isinstance(d, FragmentDefinitionNode)}
+    operations = [d for d in document.definitions if isinstance(d, OperationDefinitionNode)]
+    if operation_name:
+        operations = [op for op in operations if op.name and op.name.value == operation_name]
+
+    names = []
+    seen_fragments = set()
+
+    def collect(selection_set):
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                names.append(selection.name.value)
+            elif isinstance(selection, InlineFragmentNode):
+                collect(selection.selection_set)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                if name in fragments and name not in seen_fragments:
+                    seen_fragments.add(name)
+                    collect(fragments[name].selection_set)
+
+    for operation in operations:
+        collect(operation.selection_set)
+    return tuple(names)
+
+
+_cached_top_level_fields = lru_cache(maxsize=1024)(_top_level_fields)
+
+
+class RateLimitedGraphQLView(GraphQLView):
+    def parse_body(self, request):
+        # Multipart uploads (graphql-multipart-request-spec), as in
+        # graphene_file_upload's view, but only loaded when a file is sent
+        if self.get_content_type(request) == 'multipart/form-data':
+            from graphene_file_upload.utils import place_files_in_operations
+
+            operations = json.loads(request.POST.get('operations', '{}'))
+            files_map = json.loads(request.POST.get('map', '{}'))
+            return place_files_in_operations(operations, files_map, request.FILES)
+        return super().parse_body(request)
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, *args, **kwargs):
+        limiter = get_limiter()
+        retry_after = limiter.hit(limiter.graphql_scopes(request, top_level_fields(query, operation_name)))
+        if retry_after is not None:
+            response = HttpResponse(status=429)
+            response['Retry-After'] = str(math.ceil(retry_after))
+            raise HttpError(response, "Rate limit exceeded. Try again later.")
+        return super().execute_graphql_request(request, data, query, variables, operation_name, *args, **kwargs)
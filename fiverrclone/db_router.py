@@ -0,0 +1,190 @@
+"""
+Primary/replica routing for the ORM.
+
+Reads made while resolving a GraphQL query operation go to a healthy
+replica; every other read (sessions, auth, admin, mutations, chat) uses the
+primary. Writes always go to the primary. After a client writes, its
+requests keep reading from the primary for REPLICA_STICKY_SECONDS (tracked
+with a cookie) so it sees its own writes while the replicas catch up.
+"""
+import itertools
+import time
+
+from asgiref.local import Local
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import DatabaseError
+
+_state = Local()
+
+
+def pin_to_primary():
+    _state.use_primary = True
+
+
+def record_write():
+    """Pin this request to the primary and remember to make the client sticky."""
+    _state.use_primary = True
+    _state.wrote = True
+
+
+def has_written():
+    return getattr(_state, 'wrote', False)
+
+
+def is_pinned():
+    return getattr(_state, 'use_primary', False)
+
+
+def allow_replica_reads():
+    _state.replica_reads = True
+
+
+def replica_reads_allowed():
+    return getattr(_state, 'replica_reads', False)
+
+
+def reset_routing():
+    _state.use_primary = False
+    _state.replica_reads = False
+    _state.wrote = False
+
+
+def check_connection(alias):
+    """
+    Probe a replica with a real query. Replica SQLite files are opened with
+    mode=ro, so a missing file fails here instead of being created empty.
+    """
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        return True
+    except DatabaseError:
+        try:
+            connection.close()
+        except DatabaseError:
+            pass
+        return False
+
+
+class ReplicaSelector:
+    """
+    Round-robin over replica aliases, skipping ones that failed a health
+    check within the last `cooldown` seconds. A passing check is trusted for
+    `recheck` seconds so reads don't each pay for a probe.
+    """
+
+    def __init__(self, aliases, check=check_connection, cooldown=30, recheck=5, clock=time.monotonic):
+        self.aliases = list(aliases)
+        self.check = check
+        self.cooldown = cooldown
+        self.recheck = recheck
+        self.clock = clock
+        self._down_until = {}
+        self._healthy_until = {}
+        self._cycle = itertools.cycle(self.aliases)
+
+    def mark_down(self, alias):
+        self._healthy_until.pop(alias, None)
+        self._down_until[alias] = self.clock() + self.cooldown
+
+    def is_down(self, alias):
+        return self._down_until.get(alias, 0) > self.clock()
+
+    def is_healthy(self, alias):
+        now = self.clock()
+        if self._healthy_until.get(alias, 0) > now:
+            return True
+        if self.check(alias):
+            self._healthy_until[alias] = now + self.recheck
+            return True
+        return False
+
+    def select(self):
+        for _ in range(len(self.aliases)):
+            alias = next(self._cycle)
+            if self.is_down(alias):
+                continue
+            if self.is_healthy(alias):
+                return alias
+            self.mark_down(alias)
+        return None
+
+
+class PrimaryReplicaRouter:
+    def __init__(self, primary=DEFAULT_DB_ALIAS, replicas=None, selector=None):
+        self.primary = primary
+        if replicas is None:
+            replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        self.replicas = list(replicas)
+        self.selector = selector or ReplicaSelector(self.replicas)
+
+    def db_for_read(self, model, **hints):
+        if not self.replicas or is_pinned() or not replica_reads_allowed():
+            return self.primary
+        return self.selector.select() or self.primary
+
+    def db_for_write(self, model, **hints):
+        record_write()
+        return self.primary
+
+    def allow_relation(self, obj1, obj2, **hints):
+        dbs = {self.primary, *self.replicas}
+        if obj1._state.db in dbs and obj2._state.db in dbs:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas share the primary's schema
+        return db == self.primary or db in self.replicas
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Reset routing state per request, pin clients that wrote recently to the
+    primary, and set the sticky cookie when this request writes.
+    """
+
+    cookie_name = 'primary_until'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        reset_routing()
+        try:
+            try:
+                sticky_until = float(request.COOKIES.get(self.cookie_name, 0))
+            except ValueError:
+                sticky_until = 0
+            if sticky_until > time.time():
+                pin_to_primary()
+
+            response = self.get_response(request)
+
+            if has_written():
+                ttl = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+                response.set_cookie(
+                    self.cookie_name, str(time.time() + ttl), max_age=ttl, httponly=True, samesite='Lax',
+                )
+            return response
+        finally:
+            reset_routing()
+
+
+class OperationRoutingMiddleware:
+    """
+    Graphene middleware: resolvers of a query operation may read from a
+    replica. Mutation resolvers read from the primary, so permission checks
+    see the row they are about to update.
+    """
+
+    def resolve(self, next, root, info, **args):
+        operation = info.operation.operation
+        operation = getattr(operation, 'value', operation)
+        if operation == 'query':
+            allow_replica_reads()
+        elif operation == 'mutation':
+            pin_to_primary()
+        return next(root, info, **args)
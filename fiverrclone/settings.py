@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,10 +44,14 @@ INSTALLED_APPS = [
 
 GRAPHENE = {
     "SCHEMA": "fiverrclone.schema.schema",  # Path to your GraphQL schema
+    "MIDDLEWARE": [
+        "fiverrclone.db_router.OperationRoutingMiddleware",
+    ],
 }
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'fiverrclone.db_router.ReplicaStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -81,12 +86,54 @@ WSGI_APPLICATION = 'fiverrclone.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Keep connections open between requests and check them before reuse
+CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Tuned SQLite mode: WAL pragmas and a single writer thread (see core/sqlite.py)
+SQLITE_TUNED = os.environ.get('SQLITE_TUNED', '0') == '1'
+if SQLITE_TUNED:
+    DATABASES['default']['OPTIONS'] = {'timeout': 20}
+
+# Read replicas, e.g. DB_REPLICAS=replica1.sqlite3,replica2.sqlite3
+DATABASE_REPLICAS = []
+for i, name in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1):
+    alias = f'replica{i}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        # Read-only, so a missing replica file is an error rather than a new empty database
+        'NAME': f"file:{BASE_DIR / name.strip()}?mode=ro",
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['fiverrclone.db_router.PrimaryReplicaRouter']
+
+# After a write, keep the client on the primary at least this long (should
+# cover replica lag) so it reads its own writes
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+
+
+# Rate limits as (requests per second, burst), see core/ratelimit.py
+RATE_LIMITS = {
+    'user': (10, 50),
+    'ip': (20, 100),
+    'operation': (5, 20),
+    'operation:tokenAuth': (0.2, 5),
+    'websocket': (5, 20),
 }
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'core.ratelimit.LocalBackend')
+RATE_LIMIT_REDIS_URL = os.environ.get('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')
 
 
 # Password validation
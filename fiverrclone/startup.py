@@ -0,0 +1,23 @@
+"""
+Optional worker warm-up.
+
+Nothing here runs on import: by default the URLconf and the GraphQL schema
+load lazily on the first request. To pay that cost before a worker takes
+traffic instead, call warm_up() from a post-fork hook, so it runs in each
+worker after forking and never in a pre-fork master, e.g. in
+gunicorn.conf.py:
+
+    def post_worker_init(worker):
+        from fiverrclone.startup import warm_up
+        warm_up()
+"""
+from importlib import import_module
+
+from django.conf import settings
+
+
+def warm_up():
+    # The URLconf pulls in the GraphQL view; the schema module builds the
+    # full Graphene type graph
+    import_module(settings.ROOT_URLCONF)
+    import_module('fiverrclone.schema')
@@ -1,11 +1,9 @@
 from django.contrib import admin
 from django.urls import path
-from graphene_django.views import GraphQLView
+from core.views import RateLimitedGraphQLView
 from django.views.decorators.csrf import csrf_exempt
-from graphene_file_upload import FileUploadGraphQLView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('graphql/', csrf_exempt(GraphQLView.as_view(graphiql=True))),
-     path("graphql/", FileUploadGraphQLView.as_view(graphiql=True)),
+    path('graphql/', csrf_exempt(RateLimitedGraphQLView.as_view(graphiql=True))),
 ]